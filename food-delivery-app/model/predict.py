@@ -3,20 +3,74 @@ import numpy as np
 import joblib
 import json
 from datetime import datetime
+from collections import OrderedDict
+from statistics import NormalDist
+import threading
 import warnings
 warnings.filterwarnings('ignore')
 
+# Loaded model artifacts and their load token keyed by model path, shared by all
+# predictor instances. New predictors reuse an entry; an explicit load_model()
+# call refreshes it
+_MODEL_CACHE = {}
+
+# Predictions for repeated orders keyed by (load token, order key), least
+# recently used first. Shared by all predictor instances like _MODEL_CACHE;
+# entries of a replaced model are never hit again and age out
+_PREDICTION_CACHE = OrderedDict()
+_PREDICTION_CACHE_LOCK = threading.Lock()
+
+# Number of distinct orders whose predictions are kept for repeated queries
+_PREDICTION_CACHE_SIZE = 4096
+
+# Order fields that make up the prediction cache key
+_PREDICTION_KEY_COLUMNS = (
+    'distance_km', 'delivery_person_rating', 'vehicle_type', 'order_type',
+    'weather_condition', 'time_of_day', 'day_of_week', 'preparation_time'
+)
+
 class DeliveryTimePredictor:
     def __init__(self, model_path='delivery_time_model.pkl'):
         """Initialize the predictor with a trained model"""
         self.model_path = model_path
         self.model_artifacts = None
-        self.load_model()
+        self.load_model(use_cache=True)
     
-    def load_model(self):
-        """Load the trained model and preprocessors"""
+    def load_model(self, use_cache=False):
+        """Load the trained model and preprocessors, reading the file unless use_cache is set"""
         try:
-            self.model_artifacts = joblib.load(self.model_path)
+            cached = _MODEL_CACHE.get(self.model_path) if use_cache else None
+            if cached is None:
+                # Memory-map the model arrays instead of copying them into RAM
+                model_artifacts = joblib.load(self.model_path, mmap_mode='r')
+                model_token = object()
+            else:
+                model_artifacts, model_token = cached
+            
+            # Precompute lookups for the single-record fast path
+            feature_cols = model_artifacts['feature_columns']
+            self._feature_index = {col: i for i, col in enumerate(feature_cols)}
+            self._category_maps = {
+                col: dict(zip(le.classes_, le.transform(le.classes_)))
+                for col, le in model_artifacts['label_encoders'].items()
+            }
+            
+            # Inline the scaler as a subtract-and-multiply
+            scaler = model_artifacts['scaler']
+            self._mean = scaler.mean_
+            self._inv_scale = 1.0 / scaler.scale_
+            
+            # Width of the quantile interval in standard deviations of a normal
+            # distribution, used to turn the interval into a prediction std
+            lower_q, upper_q = model_artifacts['interval_quantiles']
+            self._interval_width = NormalDist().inv_cdf(upper_q) - NormalDist().inv_cdf(lower_q)
+            
+            self.model_artifacts = model_artifacts
+            self._model_token = model_token
+            
+            # Only share artifacts that loaded completely
+            if cached is None:
+                _MODEL_CACHE[self.model_path] = (model_artifacts, model_token)
             print(f"✅ Model loaded successfully from {self.model_path}")
         except FileNotFoundError:
             print(f"❌ Model file not found: {self.model_path}")
@@ -31,34 +85,24 @@ class DeliveryTimePredictor:
         if self.model_artifacts is None:
             raise ValueError("Model not loaded. Cannot preprocess input.")
         
-        # Convert to DataFrame if it's a dictionary
+        # Single records skip pandas and are written straight into a feature row
         if isinstance(input_data, dict):
-            input_data = pd.DataFrame([input_data])
+            return self._preprocess_record(input_data)
         elif not isinstance(input_data, pd.DataFrame):
             raise ValueError("Input data must be a dictionary or pandas DataFrame")
         
         # Create a copy to avoid modifying original data
         df = input_data.copy()
         
-        # Encode categorical variables using saved encoders
-        label_encoders = self.model_artifacts['label_encoders']
-        categorical_cols = ['vehicle_type', 'order_type', 'weather_condition', 
-                           'time_of_day', 'day_of_week']
-        
-        for col in categorical_cols:
+        # Encode categorical variables using the precomputed class mappings
+        for col, mapping in self._category_maps.items():
             if col in df.columns:
-                try:
-                    df[col + '_encoded'] = label_encoders[col].transform(df[col])
-                except ValueError as e:
+                encoded = df[col].map(mapping)
+                if encoded.isna().any():
                     # Handle unseen categories
                     print(f"Warning: Unseen category in {col}. Using default encoding.")
-                    df[col + '_encoded'] = 0
-        
-        # Feature engineering
-        df['distance_squared'] = df['distance_km'] ** 2
-        df['rating_distance_interaction'] = (
-            df['delivery_person_rating'] * df['distance_km']
-        )
+                    encoded = encoded.fillna(0)
+                df[col + '_encoded'] = encoded.astype(np.int32)
         
         # Select and order features as expected by the model
         feature_cols = self.model_artifacts['feature_columns']
@@ -70,6 +114,50 @@ class DeliveryTimePredictor:
         
         return df[feature_cols]
     
+    def _preprocess_record(self, record):
+        """Build the feature row for a single input dictionary"""
+        X = np.zeros((1, len(self._feature_index)))
+        self._fill_feature_row(record, X[0])
+        return X
+    
+    def _fill_feature_row(self, record, row):
+        """Write the features of one input dictionary into a preallocated row"""
+        feature_index = self._feature_index
+        
+        for col, i in feature_index.items():
+            if col in record:
+                row[i] = record[col]
+        
+        # Encode categorical variables using the precomputed class mappings
+        for col, mapping in self._category_maps.items():
+            if col in record:
+                code = mapping.get(record[col])
+                if code is None:
+                    # Handle unseen categories
+                    print(f"Warning: Unseen category in {col}. Using default encoding.")
+                    code = 0
+                row[feature_index[col + '_encoded']] = code
+    
+    def _predict_features(self, X):
+        """Predict delivery times and their spread for a preprocessed feature matrix"""
+        # Scale features
+        X_scaled = np.asarray(X, dtype=np.float64) - self._mean
+        X_scaled *= self._inv_scale
+        
+        # Make prediction
+        model = self.model_artifacts['model']
+        prediction = model.predict(X_scaled)
+        
+        # Estimate the spread from the lower and upper quantile models
+        lower_model, upper_model = self.model_artifacts['interval_models']
+        interval = upper_model.predict(X_scaled) - lower_model.predict(X_scaled)
+        prediction_std = np.maximum(interval, 0) / self._interval_width
+        
+        # Calculate confidence (based on prediction variance)
+        confidence = np.maximum(0.6, 1 - (prediction_std / prediction))
+        
+        return prediction, confidence, prediction_std
+    
     def predict(self, input_data):
         """Make delivery time prediction"""
         if self.model_artifacts is None:
@@ -79,19 +167,7 @@ class DeliveryTimePredictor:
             # Preprocess input
             X = self.preprocess_input(input_data)
             
-            # Scale features
-            scaler = self.model_artifacts['scaler']
-            X_scaled = scaler.transform(X)
-            
-            # Make prediction
-            model = self.model_artifacts['model']
-            prediction = model.predict(X_scaled)
-            
-            # Calculate confidence (based on prediction variance)
-            # For Random Forest, we can use the standard deviation of tree predictions
-            tree_predictions = np.array([tree.predict(X_scaled) for tree in model.estimators_])
-            prediction_std = np.std(tree_predictions, axis=0)
-            confidence = np.maximum(0.6, 1 - (prediction_std / prediction))
+            prediction, confidence, prediction_std = self._predict_features(X)
             
             return {
                 'estimated_time': float(prediction[0]),
@@ -102,16 +178,73 @@ class DeliveryTimePredictor:
         except Exception as e:
             raise ValueError(f"Prediction failed: {str(e)}")
     
+    def predict_batch(self, orders):
+        """Make delivery time predictions for a list of orders in one model pass"""
+        if self.model_artifacts is None:
+            raise ValueError("Model not loaded. Cannot make predictions.")
+        
+        if not orders:
+            return []
+        
+        try:
+            # Build one feature matrix for all orders
+            X = np.zeros((len(orders), len(self._feature_index)))
+            for order, row in zip(orders, X):
+                self._fill_feature_row(order, row)
+            
+            prediction, confidence, prediction_std = self._predict_features(X)
+            
+            return [
+                {
+                    'estimated_time': float(prediction[i]),
+                    'confidence': float(confidence[i]),
+                    'prediction_std': float(prediction_std[i])
+                }
+                for i in range(len(orders))
+            ]
+            
+        except Exception as e:
+            raise ValueError(f"Batch prediction failed: {str(e)}")
+    
+    def _cached_prediction(self, record, key):
+        """Make delivery time prediction, reusing the result for a repeated order"""
+        cache_key = (self._model_token, key)
+        with _PREDICTION_CACHE_LOCK:
+            prediction = _PREDICTION_CACHE.get(cache_key)
+            if prediction is not None:
+                _PREDICTION_CACHE.move_to_end(cache_key)
+                return prediction
+        
+        # Predict outside the lock so other threads are not held up by the model
+        prediction = self.predict(record)
+        with _PREDICTION_CACHE_LOCK:
+            _PREDICTION_CACHE[cache_key] = prediction
+            if len(_PREDICTION_CACHE) > _PREDICTION_CACHE_SIZE:
+                _PREDICTION_CACHE.popitem(last=False)
+        return prediction
+    
     def predict_with_breakdown(self, input_data):
         """Make prediction with detailed breakdown"""
-        base_prediction = self.predict(input_data)
-        
         # Extract input parameters
         if isinstance(input_data, dict):
             params = input_data
         else:
             params = input_data.iloc[0].to_dict()
         
+        # Serve complete orders from the prediction cache
+        key = None
+        if isinstance(input_data, dict):
+            try:
+                key = tuple(params[col] for col in _PREDICTION_KEY_COLUMNS)
+                hash(key)
+            except (KeyError, TypeError):
+                key = None
+        
+        if key is not None:
+            base_prediction = self._cached_prediction(params, key)
+        else:
+            base_prediction = self.predict(input_data)
+        
         # Calculate breakdown components
         prep_time = params.get('preparation_time', 15)
         distance = params.get('distance_km', 3)
@@ -210,6 +343,12 @@ if __name__ == "__main__":
                 print(f"Error: {e}")
                 print("-" * 50)
         
+        # Predict all orders in a single batch
+        print("\n📦 Batch prediction:")
+        for i, result in enumerate(predictor.predict_batch(sample_orders), 1):
+            print(f"Order {i}: {result['estimated_time']:.1f} minutes "
+                  f"(confidence {result['confidence']:.2f})")
+        
         # Show model info
         print("\n📊 Model Information:")
         model_info = predictor.get_model_info()
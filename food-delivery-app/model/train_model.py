@@ -1,82 +1,99 @@
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import json
+import os
+import tempfile
 from datetime import datetime
 
-def generate_sample_data(n_samples=10000):
+# Quantiles of the delivery time interval used for the prediction confidence
+INTERVAL_QUANTILES = (0.1, 0.9)
+
+def generate_sample_data(n_samples=10000, rng=None):
     """Generate sample delivery data for training"""
-    np.random.seed(42)
+    if rng is None:
+        rng = np.random.default_rng(42)
+    
+    # Preparation time is floored at 5 minutes in place
+    preparation_time = rng.normal(15, 5, n_samples)
+    preparation_time.clip(min=5, out=preparation_time)
     
     # Generate features
     data = {
-        'delivery_person_rating': np.random.uniform(1, 5, n_samples),
-        'distance_km': np.random.exponential(3, n_samples),  # Most deliveries are short
-        'preparation_time': np.random.normal(15, 5, n_samples),
-        'vehicle_type': np.random.choice(['bike', 'bicycle'], n_samples, p=[0.7, 0.3]),
-        'order_type': np.random.choice(['normal', 'delicate'], n_samples, p=[0.8, 0.2]),
-        'weather_condition': np.random.choice(
+        'delivery_person_rating': rng.uniform(1, 5, n_samples),
+        'distance_km': rng.exponential(3, n_samples),  # Most deliveries are short
+        'preparation_time': preparation_time,
+        'vehicle_type': rng.choice(['bike', 'bicycle'], n_samples, p=[0.7, 0.3]),
+        'order_type': rng.choice(['normal', 'delicate'], n_samples, p=[0.8, 0.2]),
+        'weather_condition': rng.choice(
             ['clear', 'cloudy', 'light_rain', 'heavy_rain', 'storm'], 
             n_samples, 
             p=[0.4, 0.3, 0.15, 0.1, 0.05]
         ),
-        'time_of_day': np.random.choice(['morning', 'afternoon', 'evening', 'night'], n_samples),
-        'day_of_week': np.random.choice(['weekday', 'weekend'], n_samples, p=[0.7, 0.3])
+        'time_of_day': rng.choice(['morning', 'afternoon', 'evening', 'night'], n_samples),
+        'day_of_week': rng.choice(['weekday', 'weekend'], n_samples, p=[0.7, 0.3])
     }
     
-    df = pd.DataFrame(data)
-    
-    # Ensure positive values
-    df['distance_km'] = np.abs(df['distance_km'])
-    df['preparation_time'] = np.maximum(df['preparation_time'], 5)
-    
-    return df
+    return pd.DataFrame(data)
 
-def calculate_delivery_time(df):
+def calculate_delivery_time(df, rng=None):
     """Calculate target delivery time based on features"""
-    delivery_times = []
+    if rng is None:
+        # Independent of generate_sample_data's default stream, so the noise does
+        # not replay the draws behind the features
+        rng = np.random.default_rng(np.random.SeedSequence(42).spawn(2)[1])
     
-    for _, row in df.iterrows():
-        # Base travel time (minutes per km)
-        base_speed = 3.5 if row['vehicle_type'] == 'bike' else 5.0
-        travel_time = row['distance_km'] * base_speed
-        
-        # Delivery person efficiency
-        efficiency = (row['delivery_person_rating'] / 5) * 0.8 + 0.2
-        travel_time = travel_time / efficiency
-        
-        # Weather impact
-        weather_delays = {
-            'clear': 0, 'cloudy': 1, 'light_rain': 3, 
-            'heavy_rain': 8, 'storm': 15
-        }
-        weather_delay = weather_delays.get(row['weather_condition'], 0)
-        
-        # Order type impact
-        order_delay = 3 if row['order_type'] == 'delicate' else 0
-        
-        # Time of day impact (traffic)
-        time_delays = {'morning': 2, 'afternoon': 1, 'evening': 4, 'night': 0}
-        time_delay = time_delays.get(row['time_of_day'], 0)
-        
-        # Weekend vs weekday
-        weekend_factor = 0.9 if row['day_of_week'] == 'weekend' else 1.0
-        
-        # Calculate total time
-        total_time = (row['preparation_time'] + travel_time + weather_delay + 
-                     order_delay + time_delay) * weekend_factor
-        
-        # Add some noise
-        noise = np.random.normal(0, 2)
-        total_time += noise
-        
-        delivery_times.append(max(total_time, 10))  # Minimum 10 minutes
+    n_samples = len(df)
+    
+    # Base travel time (minutes per km)
+    base_speed = np.where(df['vehicle_type'].values == 'bike', 3.5, 5.0)
+    travel_time = df['distance_km'].values * base_speed
+    
+    # Delivery person efficiency
+    efficiency = (df['delivery_person_rating'].values / 5) * 0.8 + 0.2
+    travel_time = travel_time / efficiency
+    
+    # Weather impact
+    weather_delays = {
+        'clear': 0, 'cloudy': 1, 'light_rain': 3, 
+        'heavy_rain': 8, 'storm': 15
+    }
+    weather_delay = (
+        pd.Series(weather_delays, dtype=float)
+        .reindex(df['weather_condition'].values)
+        .fillna(0)
+        .values
+    )
+    
+    # Order type impact
+    order_delay = np.where(df['order_type'].values == 'delicate', 3, 0)
+    
+    # Time of day impact (traffic)
+    time_delays = {'morning': 2, 'afternoon': 1, 'evening': 4, 'night': 0}
+    time_delay = (
+        pd.Series(time_delays, dtype=float)
+        .reindex(df['time_of_day'].values)
+        .fillna(0)
+        .values
+    )
+    
+    # Weekend vs weekday
+    weekend_factor = np.where(df['day_of_week'].values == 'weekend', 0.9, 1.0)
+    
+    # Calculate total time
+    total_time = (df['preparation_time'].values + travel_time + weather_delay + 
+                  order_delay + time_delay) * weekend_factor
+    
+    # Add some noise
+    noise = rng.normal(0, 2, n_samples)
+    total_time += noise
     
-    return np.array(delivery_times)
+    return np.maximum(total_time, 10)  # Minimum 10 minutes
 
 def preprocess_features(df):
     """Preprocess features for training"""
@@ -93,18 +110,11 @@ def preprocess_features(df):
         df_processed[col + '_encoded'] = le.fit_transform(df_processed[col])
         label_encoders[col] = le
     
-    # Feature engineering
-    df_processed['distance_squared'] = df_processed['distance_km'] ** 2
-    df_processed['rating_distance_interaction'] = (
-        df_processed['delivery_person_rating'] * df_processed['distance_km']
-    )
-    
     # Select features for training
     feature_cols = [
         'delivery_person_rating', 'distance_km', 'preparation_time',
         'vehicle_type_encoded', 'order_type_encoded', 'weather_condition_encoded',
-        'time_of_day_encoded', 'day_of_week_encoded',
-        'distance_squared', 'rating_distance_interaction'
+        'time_of_day_encoded', 'day_of_week_encoded'
     ]
     
     return df_processed[feature_cols], label_encoders
@@ -113,13 +123,16 @@ def train_model():
     """Train the delivery time prediction model"""
     print("🚀 Starting model training...")
     
+    # Share one seeded generator so data and targets are reproducible
+    rng = np.random.default_rng(42)
+    
     # Generate training data
     print("📊 Generating sample data...")
-    df = generate_sample_data(50000)
+    df = generate_sample_data(50000, rng)
     
     # Calculate target variable
     print("🎯 Calculating delivery times...")
-    y = calculate_delivery_time(df)
+    y = calculate_delivery_time(df, rng)
     
     # Preprocess features
     print("🔧 Preprocessing features...")
@@ -136,18 +149,31 @@ def train_model():
     X_test_scaled = scaler.transform(X_test)
     
     # Train model
-    print("🤖 Training Random Forest model...")
-    model = RandomForestRegressor(
-        n_estimators=100,
-        max_depth=15,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=42,
-        n_jobs=-1
+    print("🤖 Training Gradient Boosting model...")
+    model = HistGradientBoostingRegressor(
+        max_iter=200,
+        max_depth=8,
+        learning_rate=0.05,
+        random_state=42
     )
     
     model.fit(X_train_scaled, y_train)
     
+    # Train quantile models bounding the delivery time interval, used for confidence
+    print("📏 Training prediction interval models...")
+    interval_models = []
+    for quantile in INTERVAL_QUANTILES:
+        interval_model = HistGradientBoostingRegressor(
+            loss='quantile',
+            quantile=quantile,
+            max_iter=200,
+            max_depth=8,
+            learning_rate=0.05,
+            random_state=42
+        )
+        interval_model.fit(X_train_scaled, y_train)
+        interval_models.append(interval_model)
+    
     # Make predictions
     y_pred = model.predict(X_test_scaled)
     
@@ -162,10 +188,13 @@ def train_model():
     print(f"   Root Mean Square Error: {rmse:.2f} minutes")
     print(f"   R² Score: {r2:.3f}")
     
-    # Feature importance
+    # Feature importance (permutation based, boosted trees have no impurity importances)
+    importance = permutation_importance(
+        model, X_test_scaled, y_test, n_repeats=5, random_state=42
+    )
     feature_importance = pd.DataFrame({
         'feature': X.columns,
-        'importance': model.feature_importances_
+        'importance': importance.importances_mean
     }).sort_values('importance', ascending=False)
     
     print(f"\n🔍 Top 5 Most Important Features:")
@@ -177,6 +206,8 @@ def train_model():
     
     model_artifacts = {
         'model': model,
+        'interval_models': interval_models,
+        'interval_quantiles': INTERVAL_QUANTILES,
         'scaler': scaler,
         'label_encoders': label_encoders,
         'feature_columns': list(X.columns),
@@ -190,12 +221,28 @@ def train_model():
         'training_samples': len(X_train)
     }
     
-    # Save as pickle file
-    joblib.dump(model_artifacts, 'delivery_time_model.pkl')
+    # Save as an uncompressed pickle file so predict.py can memory-map it. Write to
+    # a temporary file and rename it into place: rewriting the file in place would
+    # corrupt the pages of any running predictor that has the old model mapped
+    fd, tmp_path = tempfile.mkstemp(suffix='.pkl', dir='.')
+    os.close(fd)
+    try:
+        joblib.dump(model_artifacts, tmp_path)
+        
+        # mkstemp creates the file owner-only; give it the usual umask-derived mode
+        # so predictors running as other users can still read the model
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        
+        os.replace(tmp_path, 'delivery_time_model.pkl')
+    except BaseException:
+        os.remove(tmp_path)
+        raise
     
     # Save metadata as JSON
     metadata = {
-        'model_version': '1.0.0',
+        'model_version': '2.0.0',
         'training_date': datetime.now().isoformat(),
         'training_samples': len(X_train),
         'test_samples': len(X_test),